@@ -0,0 +1,99 @@
+from collections import OrderedDict
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from combinatorics import number_system, valid_edges
+
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def popcount(bits: np.ndarray, chunk: int = 2 ** 20) -> int:
+    # a chunk at a time, so memory-mapped bits are not copied whole
+    bits = bits.reshape(-1)
+    return sum(int(_POPCOUNT[bits[lo:lo + chunk]].sum(dtype=np.int64)) for lo in range(0, len(bits), chunk))
+
+
+def popcount_rows(bits: np.ndarray) -> np.ndarray:
+    return _POPCOUNT[bits].sum(axis=-1, dtype=np.int64)
+
+
+def test_bits(bits: np.ndarray, idxs: np.ndarray) -> np.ndarray:
+    """Read positions `idxs` of the little-endian packed bit array `bits`."""
+    idxs = np.asarray(idxs, dtype=np.int64)
+    return ((bits[idxs >> 3] >> (idxs & 7).astype(np.uint8)) & 1).astype(bool)
+
+
+def pack_indices(idxs: np.ndarray, size: int) -> np.ndarray:
+    present = np.zeros(size, dtype=bool)
+    present[idxs] = True
+    return np.packbits(present, bitorder="little")
+
+
+class LinkBitsets:
+    """Packed link neighbourhoods of the vertices of a k-uniform hypergraph `h`.
+
+    The link of v is stored as a little-endian packed bit array over the lexicographic
+    ranks of the (k-1)-subsets of range(h.N), with a bit set when the subset together
+    with v is an edge. The link of a set S is then the AND of its members' bitsets, and
+    its size a popcount.
+
+    Links of longer sets are cached by vertex prefix, using link(T + (v,)) = link(T) & link(v),
+    so walking candidate sets depth-first (e.g. in `combinations` order) only pays one AND per
+    new set. Vertex and prefix links share one cache of at most `max_bytes`, evicting the least
+    recently used; each link takes C(N, k - 1) / 8 bytes, and an evicted vertex link is rebuilt
+    from its neighbourhood on the next use. The returned arrays are shared and read-only.
+    """
+
+    def __init__(self, h, max_bytes: int = 2 ** 30):
+        self.h = h
+        self.ranks = number_system(h.N, h.k - 1)
+        assert self.ranks.dtype is not object, "Too many (k-1)-subsets to index with a bitset"
+        self.max_bytes = max_bytes
+        self.cache: OrderedDict[Tuple[int, ...], np.ndarray] = OrderedDict()
+        self._nbytes = 0
+
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def _store(self, s: Tuple[int, ...], bits: np.ndarray) -> np.ndarray:
+        bits.flags.writeable = False
+        self.cache[s] = bits
+        self._nbytes += bits.nbytes
+        # the newest link is always kept, even when it alone exceeds the budget
+        while self._nbytes > self.max_bytes and len(self.cache) > 1:
+            self._nbytes -= self.cache.popitem(last=False)[1].nbytes
+        return bits
+
+    def vertex_link(self, v: int) -> np.ndarray:
+        return self.link((v,))
+
+    def link(self, s: Sequence[int]) -> np.ndarray:
+        s = tuple(int(v) for v in s)
+        if s in self.cache:
+            self.cache.move_to_end(s)
+            return self.cache[s]
+
+        if len(s) == 1:
+            present = np.zeros(self.ranks.total, dtype=bool)
+            for block in self.h.neighbour_blocks(s[0]):
+                present[self.ranks.rank(block)] = True
+            return self._store(s, np.packbits(present, bitorder="little"))
+        return self._store(s, np.bitwise_and(self.link(s[:-1]), self.link(s[-1:])))
+
+    def count(self, s: Sequence[int]) -> int:
+        return popcount(self.link(s))
+
+    def contains(self, bits: np.ndarray, edges: np.ndarray) -> np.ndarray:
+        """Look up the rows of `edges` in the packed link `bits` returned by `link`."""
+        edges = np.asarray(edges, dtype=np.int64)
+        inside = np.flatnonzero(valid_edges(edges, self.h.N))
+        ranks = self.ranks.rank(edges[inside])
+
+        mask = np.zeros(len(edges), dtype=bool)
+        mask[inside] = test_bits(bits, ranks)
+        return mask
+
+    def link_edges(self, s: Sequence[int]) -> np.ndarray:
+        present = np.unpackbits(self.link(s), count=self.ranks.total, bitorder="little")
+        return self.ranks.unrank(np.flatnonzero(present))
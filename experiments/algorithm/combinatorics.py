@@ -0,0 +1,110 @@
+from functools import lru_cache
+from math import comb
+from typing import Iterator, Optional, Union
+
+import numpy as np
+
+BLOCK_SIZE = 2 ** 16
+
+
+class CombinatorialNumberSystem:
+    """Lexicographic ranking of the k-subsets of range(n), vectorised over rows.
+
+    The rank of a sorted edge is its position in `itertools.combinations(range(n), k)`.
+    All binomials come from an exact integer Pascal table, so ranks stay exact even when
+    C(n, k) does not fit in a float; if it does not fit in int64 either, object arrays
+    of Python ints are used instead.
+    """
+
+    def __init__(self, n: int, k: int):
+        self.n = n
+        self.k = k
+        self.total = comb(n, k)
+        self.dtype = rank_dtype(n, k)
+
+        # table[d, i] = C(d, i) for 0 <= d < n, 0 <= i <= k, built column by column
+        # from the hockey-stick identity C(d, i) = sum_{j < d} C(j, i - 1)
+        self.table = np.zeros((max(n, 1), k + 1), dtype=self.dtype)
+        self.table[:, 0] = 1
+        for i in range(1, k + 1):
+            self.table[1:, i] = np.cumsum(self.table[:-1, i - 1])
+
+    def rank(self, edges: np.ndarray) -> np.ndarray:
+        edges = np.sort(np.asarray(edges, dtype=np.int64), axis=1)
+        assert edges.ndim == 2 and edges.shape[1] == self.k, "The edges must have k vertices"
+
+        # lex rank of c equals total - 1 - colex rank of the mirrored set {n - 1 - c}
+        mirrored = self.n - 1 - edges[:, ::-1]
+        colex = np.zeros(len(edges), dtype=self.dtype)
+        for i in range(self.k):
+            colex += self.table[mirrored[:, i], i + 1]
+
+        return self.total - 1 - colex
+
+    def unrank(self, ranks: np.ndarray) -> np.ndarray:
+        ranks = np.asarray(ranks, dtype=self.dtype)
+        colex = self.total - 1 - ranks
+
+        mirrored = np.empty((len(ranks), self.k), dtype=np.int64)
+        for i in range(self.k, 0, -1):
+            # largest d with C(d, i) <= colex; the column is nondecreasing in d
+            d = np.searchsorted(self.table[:, i], colex, side="right") - 1
+            mirrored[:, i - 1] = d
+            colex = colex - self.table[d, i]
+
+        return self.n - 1 - mirrored[:, ::-1]
+
+
+def valid_edges(edges: np.ndarray, n: int) -> np.ndarray:
+    """Mask of the rows of `edges` made of distinct vertices in range(n)."""
+    ordered = np.sort(edges, axis=1)
+    distinct = (ordered[:, 1:] != ordered[:, :-1]).all(axis=1)
+    return distinct & (ordered[:, 0] >= 0) & (ordered[:, -1] < n)
+
+
+def rank_dtype(n: int, k: int):
+    """int64 if the ranks and Pascal table entries of the k-subsets of range(n) fit it, else object."""
+    largest = max([comb(n, k)] + [comb(n - 1, i) for i in range(k + 1)])
+    return np.int64 if largest < 2 ** 63 else object
+
+
+def to_words(ranks: np.ndarray) -> np.ndarray:
+    """Ranks below 2 ** 128 as an (m, 2) array of little-endian (low, high) uint64 words."""
+    ranks = np.asarray(ranks, dtype=object)
+    words = np.empty((len(ranks), 2), dtype="<u8")
+    words[:, 0] = ranks & (2 ** 64 - 1)
+    words[:, 1] = ranks >> 64
+    return words
+
+
+def from_words(words: np.ndarray) -> np.ndarray:
+    """The object array of Python int ranks held by (m, 2) (low, high) uint64 words."""
+    return words[:, 1].astype(object) << 64 | words[:, 0].astype(object)
+
+
+@lru_cache(maxsize=32)
+def number_system(n: int, k: int) -> CombinatorialNumberSystem:
+    return CombinatorialNumberSystem(n, k)
+
+
+def combination_blocks(vertices: Union[int, np.ndarray], k: int, block_size: int = BLOCK_SIZE,
+                       start: int = 0, stop: Optional[int] = None) -> Iterator[np.ndarray]:
+    """Yield the k-subsets of `vertices` in lexicographic order as (block_size, k) arrays.
+
+    `vertices` is either a vertex count n, meaning range(n), or a sorted array of vertices.
+    `start` and `stop` restrict the output to the ranks in [start, stop).
+    """
+    if isinstance(vertices, (int, np.integer)):
+        labels, n = None, int(vertices)
+    else:
+        labels = np.asarray(vertices, dtype=np.int64)
+        n = len(labels)
+
+    if k > n:
+        return
+    ranks = number_system(n, k)
+    stop = ranks.total if stop is None else min(stop, ranks.total)
+
+    for lo in range(start, stop, block_size):
+        block = ranks.unrank(np.arange(lo, min(lo + block_size, stop), dtype=ranks.dtype))
+        yield block if labels is None else labels[block]
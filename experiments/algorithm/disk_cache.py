@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from math import ceil
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from combinatorics import number_system
+from parallel import degree_bounds, degree_chunks
+from random_graph import BitsetHypergraph, link_of
+
+DEFAULT_CACHE_DIR = Path(os.environ.get("TFM_CACHE_DIR", Path(__file__).resolve().parent / ".cache"))
+
+
+def cache_key(h) -> Optional[str]:
+    """Stable file-name key for `h` built from its class and `cache_params()`, or None."""
+    params = h.cache_params()
+    if params is None:
+        return None
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:16]
+    return f"{type(h).__name__}-{digest}"
+
+
+class DiskCache:
+    """Degree sequences and link counts of `h`, persisted under `directory` across runs.
+
+    Degrees are counted once per k-set, from its smallest vertex, in `chunks` ranges of
+    smallest vertices of roughly equal work, on a process pool (see `parallel.degree_chunks`).
+    After each chunk the running sums and the chunk's done flag are saved together to one
+    `.npy` file, so an interrupted run resumes with the unfinished chunks and a finished one
+    loads instantly.
+
+    Link counts are appended to a flat int64 record log (T, count, threshold), memory-mapped
+    on open; a record answers a later query with threshold `th` whenever `count >= th`, or
+    whenever `count < threshold <= th`.
+    """
+
+    def __init__(self, h, directory=DEFAULT_CACHE_DIR, chunks: int = 64):
+        self.h = h
+        self.key = cache_key(h)
+        assert self.key is not None, f"{type(h).__name__} has no cache_params()"
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.chunks = chunks
+
+        with open(self.directory / f"{self.key}.json", "w") as f:
+            json.dump(h.cache_params(), f, sort_keys=True)
+
+        self.link_counts = {}
+        self._load_link_counts()
+
+    def degree_sequence(self, workers: Optional[int] = None) -> np.ndarray:
+        if self.h.N > 0 and self.h.analytic_degree(0) is not None:
+            # closed forms are cheaper to recompute than to read back
+            return self.h.degree_sequence()
+
+        bounds = degree_bounds(self.h, self.chunks)
+        n_chunks = len(bounds) - 1
+        path = self.directory / f"{self.key}.degree-sums.npy"
+        # done flags of the chunks, then the degrees accumulated from them
+        state = np.load(path) if path.exists() else np.zeros(n_chunks + self.h.N, dtype=np.int64)
+        done, degrees = state[:n_chunks], state[n_chunks:]
+
+        todo = [i for i in range(n_chunks) if not done[i]]
+        for i, partial in degree_chunks(self.h, bounds, todo, workers):
+            degrees += partial
+            done[i] = 1
+            # flags and sums are replaced together, so no chunk is ever counted twice
+            tmp = self.directory / f"{self.key}.degree-sums.{os.getpid()}.tmp.npy"
+            np.save(tmp, state)
+            os.replace(tmp, path)
+
+        return degrees
+
+    def _links_path(self) -> Path:
+        return self.directory / f"{self.key}.links.bin"
+
+    def _load_link_counts(self):
+        path = self._links_path()
+        size = path.stat().st_size if path.exists() else 0
+        pos = 0
+
+        if size >= 8:
+            words = np.memmap(path, dtype=np.int64, mode="r", shape=(size // 8,))
+            # records are (t, T_1, ..., T_t, count, threshold)
+            while pos < len(words) and pos + int(words[pos]) + 3 <= len(words):
+                t = int(words[pos])
+                record = words[pos + 1:pos + t + 3].tolist()
+                self.link_counts[tuple(record[:t])] = (record[t], record[t + 1])
+                pos += t + 3
+            del words
+
+        # drop a record torn by an interrupted write before appending after it
+        if pos * 8 < size:
+            os.truncate(path, pos * 8)
+
+    def link_count_at_least(self, T: Sequence[int], threshold, bitsets=None) -> int:
+        """Cached `link_of(h, T).count_edges_at_least(threshold)`."""
+        T = tuple(int(v) for v in T)
+        threshold = ceil(threshold)
+        if T in self.link_counts:
+            count, known = self.link_counts[T]
+            if count >= threshold or count < known <= threshold:
+                return count
+
+        count = link_of(self.h, T, bitsets).count_edges_at_least(threshold)
+        self.link_counts[T] = (count, threshold)
+        with open(self._links_path(), "ab") as f:
+            f.write(np.array([len(T), *T, count, threshold], dtype=np.int64).tobytes())
+        return count
+
+
+def _fill_bitmap(h, path: Path, lo: int, hi: int):
+    # bytes [lo, hi) of the indicator hold the ranks [8 * lo, 8 * hi)
+    ranks = number_system(h.N, h.k)
+    bits = np.load(path, mmap_mode="r+")
+    present = h.is_edge_batch(ranks.unrank(np.arange(8 * lo, min(8 * hi, ranks.total))))
+    bits[lo:hi] = np.packbits(present, bitorder="little")
+    bits.flush()
+
+
+def edge_bitmap(h, directory=DEFAULT_CACHE_DIR, workers: Optional[int] = None,
+                block_bytes: int = 2 ** 17) -> BitsetHypergraph:
+    """`h` as a `BitsetHypergraph` over a memory-mapped, read-only edge indicator file.
+
+    The first call for a given `cache_key(h)` evaluates every k-set once, `block_bytes` bytes of
+    the indicator per task on a process pool, each task writing straight into the mapped file.
+    The file only gets its final name once complete, so later calls, from this or any other
+    process, just map it and share the pages through the OS page cache.
+    """
+    key = cache_key(h)
+    assert key is not None, f"{type(h).__name__} has no cache_params()"
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"{key}.bitmap.npy"
+
+    if not path.exists():
+        n_bytes = ceil(number_system(h.N, h.k).total / 8)
+        tmp = directory / f"{key}.bitmap.{os.getpid()}.tmp.npy"
+        np.lib.format.open_memmap(tmp, mode="w+", dtype=np.uint8, shape=(n_bytes,)).flush()
+
+        blocks = [(lo, min(lo + block_bytes, n_bytes)) for lo in range(0, n_bytes, block_bytes)]
+        workers = workers or os.cpu_count() or 1
+        if workers == 1 or len(blocks) == 1:
+            for lo, hi in blocks:
+                _fill_bitmap(h, tmp, lo, hi)
+        else:
+            with ProcessPoolExecutor(workers) as pool:
+                for future in [pool.submit(_fill_bitmap, h, tmp, lo, hi) for lo, hi in blocks]:
+                    future.result()
+        os.replace(tmp, path)
+
+    return BitsetHypergraph(h.k, h.N, np.load(path, mmap_mode="r"), n=h.n)
@@ -0,0 +1,45 @@
+from math import sqrt
+from typing import NamedTuple
+
+import numpy as np
+from scipy.stats import norm
+
+from combinatorics import valid_edges
+
+
+class Estimate(NamedTuple):
+    value: float
+    lower: float
+    upper: float
+
+
+def wilson_interval(hits: int, samples: int, confidence: float = 0.95):
+    """Wilson score interval for a binomial proportion."""
+    if samples == 0:
+        return 0.0, 1.0
+    z = float(norm.ppf(0.5 + confidence / 2))
+    p = hits / samples
+    centre = (p + z * z / (2 * samples)) / (1 + z * z / samples)
+    spread = z * sqrt(p * (1 - p) / samples + z * z / (4 * samples ** 2)) / (1 + z * z / samples)
+    return max(0.0, centre - spread), min(1.0, centre + spread)
+
+
+def sample_subsets(rng: np.random.Generator, n: int, k: int, samples: int) -> np.ndarray:
+    """`samples` uniform k-subsets of range(n), as rows of distinct vertices."""
+    out = rng.integers(0, n, size=(samples, k))
+    bad = np.flatnonzero(~valid_edges(out, n))
+    # rejection sampling: rows with repeated vertices are redrawn, rare unless n is close to k
+    while len(bad):
+        out[bad] = rng.integers(0, n, size=(len(bad), k))
+        bad = bad[~valid_edges(out[bad], n)]
+    return out
+
+
+def estimate_fraction(is_edge_batch, sets: np.ndarray, total: float, confidence: float,
+                      block_size: int) -> Estimate:
+    hits = 0
+    for lo in range(0, len(sets), block_size):
+        hits += int(is_edge_batch(sets[lo:lo + block_size]).sum())
+
+    lower, upper = wilson_interval(hits, len(sets), confidence)
+    return Estimate(total * hits / max(1, len(sets)), total * lower, total * upper)
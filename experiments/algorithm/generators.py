@@ -0,0 +1,35 @@
+import numpy as np
+
+from combinatorics import BLOCK_SIZE, number_system
+from random_graph import ExplicitHypergraph
+
+
+def sparse_random_ranks(k: int, p: float, N: int, seed=1234, block_size: int = BLOCK_SIZE) -> np.ndarray:
+    """Sorted ranks of the edges of a binomial random k-graph G^(k)(N, p).
+
+    Instead of flipping a coin for every k-set, jump from edge to edge with geometric skips,
+    so the work is proportional to the number of edges rather than to C(N, k).
+    """
+    ranks = number_system(N, k)
+    if p <= 0:
+        return np.empty(0, dtype=ranks.dtype)
+
+    rng = np.random.default_rng(seed)
+    blocks = []
+    last = -1
+    while True:
+        gaps = rng.geometric(min(p, 1.0), size=block_size)
+        block = last + np.cumsum(gaps).astype(ranks.dtype)
+        block = block[block < ranks.total]
+        if len(block):
+            blocks.append(block)
+            last = block[-1]
+        if len(block) < block_size:
+            break
+
+    return np.concatenate(blocks) if blocks else np.empty(0, dtype=ranks.dtype)
+
+
+def sparse_random_hypergraph(k: int, p: float, N: int, seed=1234) -> ExplicitHypergraph:
+    """G^(k)(N, p) built in O(m) time, stored as an `ExplicitHypergraph`."""
+    return ExplicitHypergraph.from_ranks(k, N, sparse_random_ranks(k, p, N, seed))
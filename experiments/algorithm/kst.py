@@ -0,0 +1,119 @@
+from math import comb
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+
+from bitset import popcount, popcount_rows
+from combinatorics import valid_edges
+from random_graph import DenseHypergraph, Hypergraph
+
+# largest N ** 2 for which get_partite hands graphs to find_kst (one bit per entry)
+KST_MAX_ENTRIES = 2 ** 32
+
+
+class KSTResult(NamedTuple):
+    S: Optional[List[int]]
+    T: Optional[List[int]]
+    degrees: np.ndarray
+    # sum over pairs u < w of codeg(u, w), i.e. sum_v C(deg(v), 2); None if the pass stopped early
+    stars: Optional[int]
+    max_codegree: Optional[int]
+
+
+def adjacency_bits(h: Hypergraph) -> np.ndarray:
+    """Adjacency matrix of the graph `h` (k = 2) as little-endian packed rows, (N, ceil(N / 8))."""
+    assert h.k == 2, "Only graphs have an adjacency matrix"
+    if isinstance(h, DenseHypergraph):
+        return np.packbits(h.tensor, axis=1, bitorder="little")
+
+    bits = np.zeros((h.N, -(-h.N // 8)), dtype=np.uint8)
+    for edges in h.edge_blocks():
+        edges = edges[valid_edges(edges, h.N)]
+        for u, v in (edges.T, edges[:, ::-1].T):
+            np.bitwise_or.at(bits, (u, v >> 3), np.left_shift(1, v & 7).astype(np.uint8))
+    return bits
+
+
+def _unpack(bits: np.ndarray, N: int) -> np.ndarray:
+    # float32 products of 0/1 rows are exact up to 2 ** 24 common neighbours
+    return np.unpackbits(bits, axis=1, count=N, bitorder="little").astype(np.float32)
+
+
+def _common_neighbours(adj: np.ndarray, S: List[int], N: int) -> np.ndarray:
+    bits = np.bitwise_and.reduce(adj[S], axis=0)
+    return np.flatnonzero(np.unpackbits(bits, count=N, bitorder="little"))
+
+
+def _extend(adj: np.ndarray, chosen: List[int], bits: np.ndarray, candidates: np.ndarray,
+            s: int, t: int) -> Optional[List[int]]:
+    # links only shrink as S grows, so a prefix with fewer than t common neighbours is cut
+    if len(chosen) == s:
+        return chosen
+    for i, w in enumerate(candidates.tolist()):
+        common = np.bitwise_and(bits, adj[w])
+        if popcount(common) >= t:
+            found = _extend(adj, chosen + [w], common, candidates[i + 1:], s, t)
+            if found is not None:
+                return found
+    return None
+
+
+def find_kst(h: Hypergraph, s: int, t: int, block_size: int = 512, stats: bool = True) -> KSTResult:
+    """Find s vertices S of the graph `h` with at least t common neighbours, i.e. a K_{s,t}.
+
+    The codegree matrix A A^T is computed a block of rows at a time, against the columns to
+    its right, with float32 matrix products of the unpacked adjacency rows. Each row u then
+    only tries as second vertex of S the w > u with codeg(u, w) >= t, and longer S are
+    extended depth first by ANDing packed adjacency rows. The star count and the largest
+    codegree of the same pass are returned too; with `stats` off, the pass stops at the first
+    K_{s,t} and leaves them None. S comes first in lexicographic order; T is the first t
+    vertices of its common neighbourhood.
+    """
+    adj = adjacency_bits(h)
+    N = h.N
+    degrees = popcount_rows(adj)
+    S = None
+    stars = max_codegree = 0
+
+    for lo in range(0, N, block_size):
+        hi = min(lo + block_size, N)
+        rows = _unpack(adj[lo:hi], N)
+        # candidate[i, w]: w > lo + i and codeg(lo + i, w) >= t
+        candidate = np.zeros((hi - lo, N), dtype=bool)
+        for clo in range(lo, N, block_size):
+            chi = min(clo + block_size, N)
+            codeg = (rows @ _unpack(adj[clo:chi], N).T).astype(np.int64)
+            if clo == lo:
+                codeg = np.triu(codeg, 1)
+            stars += int(codeg.sum())
+            max_codegree = max(max_codegree, int(codeg.max(initial=0)))
+            candidate[:, clo:chi] = codeg >= t
+            if clo == lo:
+                candidate[:, clo:chi] &= np.triu(np.ones((hi - lo, chi - clo), dtype=bool), 1)
+
+        if S is None:
+            for u in range(lo, hi):
+                if degrees[u] >= t:
+                    S = _extend(adj, [u], adj[u], np.flatnonzero(candidate[u - lo]), s, t)
+                    if S is not None:
+                        break
+
+        if S is not None and not stats:
+            return KSTResult(S, _common_neighbours(adj, S, N)[:t].tolist(), degrees, None, None)
+
+    T = None if S is None else _common_neighbours(adj, S, N)[:t].tolist()
+    return KSTResult(S, T, degrees, stars, max_codegree)
+
+
+def zarankiewicz_bound(u: int, w: int, s: int, t: int) -> float:
+    """The Kővári–Sós–Turán bound on z(u, w; s, t).
+
+    A graph on N vertices with m edges and no K_{s,t} has 2m <= zarankiewicz_bound(N, N, s, t),
+    as its bipartite double cover has no K(s, t) either.
+    """
+    return (s - 1) ** (1 / t) * (w - t + 1) * u ** (1 - 1 / t) + (t - 1) * u
+
+
+def star_count(degrees: np.ndarray, r: int = 2) -> int:
+    """sum_v C(deg(v), r), the number of stars K_{1,r}."""
+    return sum(comb(int(d), r) for d in degrees.tolist())
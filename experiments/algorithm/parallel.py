@@ -0,0 +1,181 @@
+import multiprocessing as mp
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from math import ceil, comb
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy.special import binom
+
+from bitset import LinkBitsets
+from combinatorics import combination_blocks
+from random_graph import Hypergraph, link_of
+
+# per-process state, filled in by the pool initializer
+_worker = {}
+
+
+def _init_search(h: Hypergraph, W: List[int], t: int, min_s, use_bitsets: bool, best):
+    _worker.update(h=h, W=np.asarray(W, dtype=np.int64), t=t, min_s=min_s, best=best,
+                   bitsets=LinkBitsets(h) if use_bitsets else None)
+
+
+def _search_chunk(idx: int, lo: int, hi: int) -> Tuple[int, Optional[List[int]]]:
+    h, min_s, best, bitsets = _worker["h"], _worker["min_s"], _worker["best"], _worker["bitsets"]
+
+    for block in combination_blocks(_worker["W"], _worker["t"], start=lo, stop=hi):
+        for T in block.tolist():
+            # a hit in an earlier chunk always wins, so stop as soon as one is known
+            if best.value < idx:
+                return idx, None
+            if link_of(h, T, bitsets).count_edges_at_least(min_s) >= min_s:
+                with best.get_lock():
+                    best.value = min(best.value, idx)
+                return idx, T
+
+    return idx, None
+
+
+def parallel_find_T(h: Hypergraph, W: List[int], t: int, min_s, workers: Optional[int] = None,
+                    chunk_size: Optional[int] = None, use_bitsets: bool = False) -> Tuple[Optional[List[int]], int]:
+    """First T in combinations(W, t) with |link(T)| >= min_s, searched on a process pool.
+
+    The candidates are split into consecutive rank ranges of `chunk_size`, and the answer is
+    the hit from the lowest range, i.e. the same T a serial lexicographic scan would return,
+    whatever the number of workers. Workers on later ranges give up once an earlier range has
+    a hit. Returns T (or None) and the number of ranges that were searched.
+    """
+    total = comb(len(W), t)
+    workers = workers or os.cpu_count() or 1
+    chunk_size = chunk_size or max(1, ceil(total / (4 * workers)))
+    ranges = [(lo, min(lo + chunk_size, total)) for lo in range(0, total, chunk_size)]
+    if not ranges:
+        return None, 0
+
+    ctx = mp.get_context()
+    best = ctx.Value("q", len(ranges))
+    results = {}
+
+    with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_search,
+                             initargs=(h, W, t, min_s, use_bitsets, best)) as pool:
+        futures = [pool.submit(_search_chunk, idx, lo, hi) for idx, (lo, hi) in enumerate(ranges)]
+
+        for future in as_completed(futures):
+            if future.cancelled():
+                continue
+            idx, T = future.result()
+            results[idx] = T
+            if T is not None:
+                for later in futures[idx + 1:]:
+                    later.cancel()
+
+            # the answer is settled once every range before the first hit came back empty
+            first = 0
+            while results.get(first, ()) is None:
+                first += 1
+            if first == len(ranges) or results.get(first) is not None:
+                break
+
+    return results.get(first), len(results)
+
+
+def _init_degrees(h: Hypergraph, shm_name: str, n_rows: int, next_row):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    with next_row.get_lock():
+        row = next_row.value
+        next_row.value += 1
+    partial = np.ndarray((n_rows, h.N), dtype=np.int64, buffer=shm.buf)
+    # keep the mapping alive for as long as the worker uses the view
+    _worker.update(h=h, shm=shm, degrees=partial[row])
+
+
+def _count_from(h: Hypergraph, lo: int, hi: int, degrees: np.ndarray):
+    # every edge is visited once, from its smallest vertex, and credited to all its vertices;
+    # the k-sets with smallest vertex in [lo, hi) are one range of lexicographic ranks
+    total = comb(h.N, h.k)
+    start, stop = total - comb(h.N - lo, h.k), total - comb(h.N - hi, h.k)
+    for block in combination_blocks(h.N, h.k, start=start, stop=stop):
+        # only touch the vertices of this block's edges, not all N counters
+        vtxs, counts = np.unique(block[h.is_edge_batch(block)], return_counts=True)
+        degrees[vtxs] += counts
+
+
+def _degree_chunk(lo: int, hi: int):
+    _count_from(_worker["h"], lo, hi, _worker["degrees"])
+
+
+def _init_count(h: Hypergraph):
+    _worker.update(h=h)
+
+
+def _count_chunk(idx: int, lo: int, hi: int) -> Tuple[int, np.ndarray]:
+    degrees = np.zeros(_worker["h"].N, dtype=np.int64)
+    _count_from(_worker["h"], lo, hi, degrees)
+    return idx, degrees
+
+
+def degree_bounds(h: Hypergraph, chunks: int) -> np.ndarray:
+    """Split range(h.N) into at most `chunks` ranges of smallest vertices with roughly equal work.
+
+    Vertex v is the smallest vertex of C(N - 1 - v, k - 1) k-sets. Returns the range ends,
+    from 0 to N.
+    """
+    weights = binom(h.N - 1 - np.arange(h.N), h.k - 1)
+    total = float(weights.sum())
+    bounds = np.searchsorted(np.cumsum(weights), total * np.arange(1, chunks) / chunks, side="right")
+    return np.unique(np.concatenate(([0], bounds, [h.N])))
+
+
+def degree_chunks(h: Hypergraph, bounds: np.ndarray, todo: Sequence[int],
+                  workers: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray]]:
+    """Degree contributions of the k-sets whose smallest vertex is in [bounds[i], bounds[i + 1]),
+    for each i in `todo`, yielded as (i, degrees) as the chunks finish on a process pool."""
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(todo) <= 1:
+        for i in todo:
+            degrees = np.zeros(h.N, dtype=np.int64)
+            _count_from(h, int(bounds[i]), int(bounds[i + 1]), degrees)
+            yield i, degrees
+        return
+
+    with ProcessPoolExecutor(workers, initializer=_init_count, initargs=(h,)) as pool:
+        futures = [pool.submit(_count_chunk, i, int(bounds[i]), int(bounds[i + 1])) for i in todo]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def degree_sequence(h: Hypergraph, workers: Optional[int] = None, chunks: Optional[int] = None,
+                    min_parallel_work: int = 2 ** 20) -> np.ndarray:
+    """Degrees of all vertices in range(h.N), counting each k-set once on a process pool.
+
+    Vertex v enumerates the C(N - 1 - v, k - 1) k-sets whose smallest vertex it is, so the
+    vertices are split into `chunks` ranges of roughly equal total work. Each worker adds into
+    its own row of a shared-memory array, and the rows are summed at the end, so the result
+    is the same for any number of workers. Small instances are counted in-process.
+    """
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or comb(h.N, h.k) < min_parallel_work:
+        degrees = np.zeros(h.N, dtype=np.int64)
+        _count_from(h, 0, h.N, degrees)
+        return degrees
+
+    bounds = degree_bounds(h, chunks or 4 * workers)
+
+    ctx = mp.get_context()
+    shm = shared_memory.SharedMemory(create=True, size=max(1, workers * h.N * 8))
+    try:
+        partial = np.ndarray((workers, h.N), dtype=np.int64, buffer=shm.buf)
+        partial[:] = 0
+        with ProcessPoolExecutor(workers, mp_context=ctx, initializer=_init_degrees,
+                                 initargs=(h, shm.name, workers, ctx.Value("i", 0))) as pool:
+            for future in [pool.submit(_degree_chunk, lo, hi) for lo, hi in zip(bounds[:-1], bounds[1:])]:
+                future.result()
+        degrees = partial.sum(axis=0)
+        del partial
+    finally:
+        shm.close()
+        shm.unlink()
+
+    return degrees
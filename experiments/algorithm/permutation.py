@@ -0,0 +1,76 @@
+from typing import Tuple
+
+import numpy as np
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+
+def mix64(x: np.ndarray) -> np.ndarray:
+    # splitmix64 finaliser; uint64 arithmetic wraps around silently on arrays
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+class FeistelPermutation:
+    """Keyed pseudorandom permutation of range(size), evaluated on whole arrays.
+
+    A balanced Feistel network permutes the smallest even-width bit domain covering
+    `size` (at most 4 * size values), and cycle walking maps it back into range(size).
+    Domains wider than 64 bits are handled with object arrays of Python ints.
+    """
+
+    def __init__(self, size: int, seed: int = 1234, rounds: int = 4):
+        assert size >= 1, "The permutation needs a non-empty domain"
+        self.size = size
+        self.half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+        assert self.half_bits <= 64, "Domains above 2^128 are not supported"
+
+        self.mask = np.uint64(2 ** self.half_bits - 1)
+        self.wide = 2 * self.half_bits > 64
+        self.dtype = np.int64 if size <= 2 ** 63 else object
+        seed_mix = mix64(np.array([seed % 2 ** 64], dtype=np.uint64))
+        self.keys = mix64(np.arange(rounds, dtype=np.uint64) * _GOLDEN + seed_mix)
+
+    def _split(self, x: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        if self.wide:
+            return (x >> self.half_bits).astype(np.uint64), (x & int(self.mask)).astype(np.uint64)
+        x = x.astype(np.uint64)
+        return x >> np.uint64(self.half_bits), x & self.mask
+
+    def _join(self, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        if self.wide:
+            return (left.astype(object) << self.half_bits) | right.astype(object)
+        return (left << np.uint64(self.half_bits)) | right
+
+    def _encrypt(self, x: np.ndarray) -> np.ndarray:
+        left, right = self._split(x)
+        for key in self.keys:
+            left, right = right, left ^ (mix64(right ^ key) & self.mask)
+        return self._join(left, right)
+
+    def _decrypt(self, x: np.ndarray) -> np.ndarray:
+        left, right = self._split(x)
+        for key in self.keys[::-1]:
+            left, right = right ^ (mix64(left ^ key) & self.mask), left
+        return self._join(left, right)
+
+    def _walk(self, step, idxs: np.ndarray) -> np.ndarray:
+        idxs = np.asarray(idxs, dtype=object if self.wide else np.uint64)
+        out = step(idxs)
+        outside = np.flatnonzero(out >= self.size)
+        while len(outside):
+            out[outside] = step(out[outside])
+            outside = outside[out[outside] >= self.size]
+        return out.astype(self.dtype)
+
+    def __call__(self, idxs: np.ndarray) -> np.ndarray:
+        return self._walk(self._encrypt, idxs)
+
+    def inverse(self, idxs: np.ndarray) -> np.ndarray:
+        return self._walk(self._decrypt, idxs)
+
+    def __getitem__(self, idx: int) -> int:
+        return int(self(np.array([idx]))[0])
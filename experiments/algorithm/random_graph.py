@@ -1,13 +1,28 @@
 import tqdm
-from typing import Tuple, List
-from itertools import combinations
-from functools import cache
+import numpy as np
+from typing import List, Optional, Tuple
+from itertools import combinations, permutations, product
+from math import comb, factorial
 from scipy.special import binom
 
-try:
-    from random_permutation import RandomPermutation
-except ImportError:
-    RandomPermutation = None
+from combinatorics import (BLOCK_SIZE, CombinatorialNumberSystem, combination_blocks, from_words, number_system,
+                           to_words, valid_edges)
+from bitset import pack_indices, popcount, test_bits
+from estimate import Estimate, estimate_fraction, sample_subsets
+from permutation import _GOLDEN, FeistelPermutation, mix64
+
+
+# largest N ** k for which get_partite switches to a DenseHypergraph (one byte per entry)
+DENSE_MAX_ENTRIES = 2 ** 26
+
+
+def edge_hash(edges: np.ndarray, seed: int) -> np.ndarray:
+    """Counter-based 64-bit hash of each row of `edges`, independent of vertex order."""
+    edges = np.sort(np.asarray(edges, dtype=np.int64), axis=1).astype(np.uint64)
+    h = np.full(len(edges), seed % 2 ** 64, dtype=np.uint64)
+    for j in range(edges.shape[1]):
+        h = mix64(h + _GOLDEN + edges[:, j])
+    return h
 
 
 class Hypergraph:
@@ -15,112 +30,633 @@ class Hypergraph:
         self.N = N
         self.n = n
         self.k = k
+        # per-instance, unlike functools.cache, so the hypergraph can be garbage collected
+        self._degrees = {}
+
+    def cache_params(self) -> Optional[dict]:
+        """JSON-serialisable parameters that fully determine the hypergraph, if it has any."""
+        return None
 
     def is_edge(self, edge: Tuple[int, ...]) -> bool:
         raise NotImplementedError
 
-    def neighbours(self, node: int):
-
-        others = list(set(range(self.N)) - {node})
-        for other_set in tqdm.tqdm(combinations(others, self.k - 1), total=binom(self.N - 1, self.k - 1), position=1):
-        # for other_set in combinations(others, self.k - 1):
+    def is_edge_batch(self, edges: np.ndarray) -> np.ndarray:
+        """Boolean mask telling which rows of the (m, k) integer array `edges` are edges."""
+        edges = np.asarray(edges)
+        return np.fromiter((self.is_edge(tuple(e)) for e in edges.tolist()), dtype=bool, count=len(edges))
+
+    def neighbour_blocks(self, node: int, block_size: int = BLOCK_SIZE, progress: bool = False):
+        # (k-1)-subsets of range(N - 1), shifted past `node`, are those of range(N) avoiding it
+        bar = tqdm.tqdm(total=comb(self.N - 1, self.k - 1), position=1, leave=False) if progress else None
+        for others in combination_blocks(self.N - 1, self.k - 1, block_size):
+            others = others + (others >= node)
+            edges = np.column_stack((np.full(len(others), node, dtype=np.int64), others))
+            if bar is not None:
+                bar.update(len(others))
+            yield others[self.is_edge_batch(edges)]
+
+        if bar is not None:
+            bar.close()
+
+    def neighbours(self, node: int, progress: bool = False):
+        for block in self.neighbour_blocks(node, progress=progress):
+            yield from map(tuple, block.tolist())
+
+    def link(self, s: List[int]) -> "Hypergraph":
+        """The link of the vertex set `s`. Subclasses override this with a cheaper native
+        representation when they have one."""
+        return LinkGraph(self, list(s))
+
+    def analytic_degree(self, node: int) -> Optional[int]:
+        """Exact degree of `node` in closed form, or None if the class has no formula."""
+        return None
+
+    def analytic_num_edges(self) -> Optional[int]:
+        """Exact number of edges in closed form, or None if the class has no formula."""
+        return None
 
-            edge = (node, *other_set)
-            if self.is_edge(edge):
-                yield tuple(other_set)
-
-    @cache
     def degree(self, node: int):
-        return sum(1 for _ in self.neighbours(node))
+        if node not in self._degrees:
+            deg = self.analytic_degree(node)
+            if deg is None:
+                deg = sum(len(block) for block in self.neighbour_blocks(node))
+            self._degrees[node] = deg
+        return self._degrees[node]
+
+    def degree_sequence(self, workers=None) -> np.ndarray:
+        """Degrees of all vertices in range(N), see `parallel.degree_sequence`."""
+        if self.N > 0 and self.analytic_degree(0) is not None:
+            return np.array([self.analytic_degree(v) for v in range(self.N)], dtype=np.int64)
+
+        from parallel import degree_sequence
+        return degree_sequence(self, workers)
+
+    def edge_blocks(self, block_size: int = BLOCK_SIZE):
+        # every k-set is tested exactly once, a block at a time
+        for block in combination_blocks(self.N, self.k, block_size):
+            yield block[self.is_edge_batch(block)]
+
+    def edges(self):
+        for block in self.edge_blocks():
+            yield from map(tuple, block.tolist())
 
     def num_edges(self):
-        return sum(1 for e in combinations(range(self.N), self.k) if self.is_edge(e))
+        m = self.analytic_num_edges()
+        if m is not None:
+            return m
+        return sum(len(block) for block in self.edge_blocks())
+
+    def count_edges_at_least(self, threshold) -> int:
+        """Count edges until `num_edges() >= threshold` is settled either way.
+
+        The result is at least `threshold` exactly when the hypergraph has that many edges;
+        counting stops once it is reached, or once the untested k-sets can no longer reach it.
+        """
+        m = self.analytic_num_edges()
+        if m is not None:
+            return m
+
+        count = 0
+        remaining = comb(self.N, self.k)
+        for block in combination_blocks(self.N, self.k):
+            count += int(self.is_edge_batch(block).sum())
+            remaining -= len(block)
+            if count >= threshold or count + remaining < threshold:
+                break
+        return count
+
+    def has_at_least(self, threshold) -> bool:
+        return self.count_edges_at_least(threshold) >= threshold
+
+    def estimate_num_edges(self, samples: int = 10 ** 5, confidence: float = 0.95, seed=1234) -> Estimate:
+        """Monte Carlo estimate of `num_edges()` from uniform k-sets, with a Wilson interval."""
+        sets = sample_subsets(np.random.default_rng(seed), self.N, self.k, samples)
+        return estimate_fraction(self.is_edge_batch, sets, float(comb(self.N, self.k)), confidence, BLOCK_SIZE)
+
+    def estimate_degree(self, node: int, samples: int = 10 ** 4, confidence: float = 0.95, seed=1234) -> Estimate:
+        """Monte Carlo estimate of `degree(node)` from uniform (k-1)-sets avoiding `node`."""
+        others = sample_subsets(np.random.default_rng((seed, node)), self.N - 1, self.k - 1, samples)
+        others = others + (others >= node)
+        sets = np.column_stack((np.full(samples, node, dtype=np.int64), others))
+        return estimate_fraction(self.is_edge_batch, sets, float(comb(self.N - 1, self.k - 1)), confidence, BLOCK_SIZE)
+
+
+class BatchHypergraph(Hypergraph):
+    """A hypergraph that answers membership natively in batches: subclasses implement
+    `is_edge_batch`, and single edges are looked up as batches of one."""
 
+    def is_edge(self, edge: Tuple[int, ...]) -> bool:
+        if len(edge) != self.k:
+            return False
+        return bool(self.is_edge_batch(np.array([edge]))[0])
 
-class RandomOracleGraph(Hypergraph):
+
+class RandomOracleGraph(BatchHypergraph):
 
     def __init__(self, k, p, N, seed=1234):
         super().__init__(N, k, N)
         self.p = p
         self.seed = seed
+        self._num_edges = None
 
-    def is_edge(self, edge: Tuple[int, ...]) -> bool:
-        if len(edge) != self.k:
-            return False
+    def cache_params(self) -> Optional[dict]:
+        return {"k": self.k, "p": self.p, "N": self.N, "seed": self.seed}
+
+    def is_edge_batch(self, edges: np.ndarray) -> np.ndarray:
+        edges = np.asarray(edges)
+        if edges.ndim != 2 or edges.shape[1] != self.k:
+            return np.zeros(len(edges), dtype=bool)
 
-        vtxs_in_order = sorted(edge)
-        h = hash(tuple(vtxs_in_order + [self.seed])) % 1e8
-        return h < self.p * 1e8
+        # compare the top 53 bits of the hash against p, as a uniform draw in [0, 1)
+        h = edge_hash(edges, self.seed) >> np.uint64(11)
+        return h < np.uint64(min(int(self.p * 2 ** 53), 2 ** 53))
 
-    @cache
     def num_edges(self):
-        # return sum(self.degree(node) for node in tqdm.tqdm(range(self.N), position=1)) // self.k
-        return sum(self.degree(node) for node in (range(self.n))) // self.k
+        if self._num_edges is None:
+            self._num_edges = int(self.degree_sequence().sum()) // self.k
+        return self._num_edges
 
-    @cache
     def expected_num_edges(self):
         return self.p * binom(self.n, self.k)
 
 
 class StupidHypergraph(Hypergraph):
-    def __init__(self, k, mod, N):
-        super().__init__(N, k, N)
+    """k-sets of range(N) avoiding `excluded` whose sum is `residue` mod `mod`.
+
+    The defaults give the plain modular hypergraph; the other parameters describe its links.
+    """
+
+    def __init__(self, k, mod, N, residue=0, excluded=(), n=None):
+        super().__init__(N if n is None else n, k, N)
         self.mod = mod
+        self.residue = residue % mod
+        self.excluded = frozenset(int(v) for v in excluded)
+        self._sums = None
+
+    def cache_params(self) -> Optional[dict]:
+        return {"k": self.k, "mod": self.mod, "N": self.N, "residue": self.residue, "excluded": sorted(self.excluded)}
 
     def is_edge(self, edge: Tuple[int, ...]) -> bool:
-        return sum(edge) % self.mod == 0
+        return sum(edge) % self.mod == self.residue and self.excluded.isdisjoint(edge)
+
+    def is_edge_batch(self, edges: np.ndarray) -> np.ndarray:
+        edges = np.asarray(edges, dtype=np.int64)
+        mask = edges.sum(axis=1) % self.mod == self.residue
+        if self.excluded:
+            mask &= ~np.isin(edges, list(self.excluded)).any(axis=1)
+        return mask
+
+    def link(self, s: List[int]) -> Hypergraph:
+        # sum(e) + v = residue for every v in s only if all of s share one residue class
+        residues = {v % self.mod for v in s}
+        if len(residues) > 1 or not self.excluded.isdisjoint(s):
+            return ExplicitHypergraph(self.k - 1, self.N, np.empty((0, self.k - 1)), n=self.n - len(s))
+        return StupidHypergraph(self.k - 1, self.mod, self.N, self.residue - residues.pop(),
+                                self.excluded | set(s), n=self.n - len(s))
+
+    def subset_sums(self) -> List[List[int]]:
+        """sums[j][r]: number of j-subsets of range(N) whose sum is r mod `mod`, for j <= k."""
+        if self._sums is None:
+            # DP over residue classes a, each holding `size` vertices, choosing i of them
+            sums = [[int(j == 0 and r == 0) for r in range(self.mod)] for j in range(self.k + 1)]
+            for a in range(self.mod):
+                size = len(range(a, self.N, self.mod)) - sum(1 for v in self.excluded if v % self.mod == a)
+                new = [[0] * self.mod for _ in range(self.k + 1)]
+                for j in range(self.k + 1):
+                    for r in range(self.mod):
+                        if sums[j][r]:
+                            for i in range(min(size, self.k - j) + 1):
+                                new[j + i][(r + i * a) % self.mod] += sums[j][r] * comb(size, i)
+                sums = new
+            self._sums = sums
+        return self._sums
+
+    def analytic_degree(self, node: int) -> Optional[int]:
+        if not 0 <= node < self.N or node in self.excluded:
+            return 0
+        # avoid[r]: j-subsets of the allowed vertices other than node with sum r,
+        # via avoid_j = sums_j - shift(avoid_{j-1}, node)
+        sums = self.subset_sums()
+        avoid = [int(r == 0) for r in range(self.mod)]
+        for j in range(1, self.k):
+            avoid = [sums[j][r] - avoid[(r - node) % self.mod] for r in range(self.mod)]
+        return avoid[(self.residue - node) % self.mod]
+
+    def analytic_num_edges(self) -> Optional[int]:
+        return self.subset_sums()[self.k][self.residue]
+
+    def degree_sequence(self, workers=None) -> np.ndarray:
+        # apart from excluded vertices, the degree of v only depends on v mod `mod`
+        allowed = [next((v for v in range(a, self.N, self.mod) if v not in self.excluded), None)
+                   for a in range(self.mod)]
+        by_residue = np.array([0 if v is None else self.analytic_degree(v) for v in allowed], dtype=np.int64)
+        degrees = by_residue[np.arange(self.N) % self.mod]
+        degrees[list(self.excluded)] = 0
+        return degrees
+
+
+
+class RandomPermutationHypergraph(BatchHypergraph):
+
+    def __init__(self, n, k, m, N, seed=1234):
+        super().__init__(n, k, N)
+        self.m = m
+        self.seed = seed
+        self.ranks = CombinatorialNumberSystem(n, k)
+        assert 0 <= m <= self.ranks.total, "m must be at most C(n, k)"
+        self.perm = FeistelPermutation(self.ranks.total, seed=seed)
+
+    def cache_params(self) -> Optional[dict]:
+        return {"n": self.n, "k": self.k, "m": self.m, "N": self.N, "seed": self.seed}
+
+    def get_edge_index(self, edge):
+        return int(self.ranks.rank(np.array([edge]))[0])
+
+    def is_edge_batch(self, edges: np.ndarray) -> np.ndarray:
+        edges = np.asarray(edges)
+        if edges.ndim != 2 or edges.shape[1] != self.k:
+            return np.zeros(len(edges), dtype=bool)
+
+        inside = valid_edges(edges, self.n)
+        mask = np.zeros(len(edges), dtype=bool)
+        mask[inside] = self.perm(self.ranks.rank(edges[inside])) < self.m
+        return mask
+
+    def edge_blocks(self, block_size: int = BLOCK_SIZE):
+        # the edges are exactly the preimages of the first m permuted ranks
+        for start in range(0, self.m, block_size):
+            idxs = np.arange(start, min(start + block_size, self.m), dtype=self.ranks.dtype)
+            yield self.ranks.unrank(self.perm.inverse(idxs))
+
+    def num_edges(self):
+        return self.m
+
+    def count_edges_at_least(self, threshold) -> int:
+        return self.num_edges()
+
+
+class ExplicitHypergraph(BatchHypergraph):
+    """A fixed k-uniform hypergraph on range(N), stored as sorted edge ranks plus a CSR incidence index.
+
+    `edge_ranks` holds the lexicographic ranks of the edges in increasing order, `edge_array`
+    the matching sorted vertex tuples (None when wrapping existing arrays, in which case edges
+    are unranked on demand), and `incident[indptr[v]:indptr[v + 1]]` the ids of the edges
+    containing v, in increasing order. When wrapped arrays come without that index, it is
+    built on first use. Wrapped ranks beyond int64 may be given as (m, 2) little-endian
+    (low, high) uint64 words, searched high word first, and the number system, whose Pascal
+    table then holds Python ints, is only built once an edge is ranked or unranked.
+    """
+
+    def __init__(self, k, N, edges: Optional[np.ndarray] = None, n=None, edge_ranks: Optional[np.ndarray] = None):
+        super().__init__(N if n is None else n, k, N)
+        self._ranks = number_system(N, k)
+
+        if edge_ranks is None:
+            edges = np.asarray(edges, dtype=np.int64).reshape(-1, k)
+            assert valid_edges(edges, N).all(), "Every edge must have k distinct vertices in range(N)"
+            edge_ranks = self.ranks.rank(edges)
+
+        edge_ranks = np.sort(np.asarray(edge_ranks, dtype=self.ranks.dtype))
+        if len(edge_ranks):
+            edge_ranks = edge_ranks[np.concatenate(([True], edge_ranks[1:] != edge_ranks[:-1]))]
+        self.edge_ranks = edge_ranks
+        self.edge_array = self.ranks.unrank(self.edge_ranks)
+        self._build_index()
+
+    @property
+    def ranks(self) -> CombinatorialNumberSystem:
+        if self._ranks is None:
+            self._ranks = number_system(self.N, self.k)
+        return self._ranks
+
+    def _build_index(self):
+        flat = self._edges_at(slice(None)).ravel()
+        self._incident = np.argsort(flat, kind="stable") // self.k
+        self._indptr = np.zeros(self.N + 1, dtype=np.int64)
+        np.cumsum(np.bincount(flat, minlength=self.N), out=self._indptr[1:])
+
+    @property
+    def indptr(self) -> np.ndarray:
+        if self._indptr is None:
+            self._build_index()
+        return self._indptr
+
+    @property
+    def incident(self) -> np.ndarray:
+        if self._incident is None:
+            self._build_index()
+        return self._incident
+
+    @classmethod
+    def from_ranks(cls, k, N, ranks: np.ndarray, n=None) -> "ExplicitHypergraph":
+        return cls(k, N, n=n, edge_ranks=ranks)
+
+    @classmethod
+    def from_arrays(cls, k, N, edge_ranks: np.ndarray, indptr: Optional[np.ndarray] = None,
+                    incident: Optional[np.ndarray] = None, n=None) -> "ExplicitHypergraph":
+        """Wrap already sorted, duplicate-free ranks and, if given, their CSR index without copying."""
+        h = cls.__new__(cls)
+        Hypergraph.__init__(h, N if n is None else n, k, N)
+        h._ranks = None
+        h.edge_ranks = edge_ranks
+        h.edge_array = None
+        h._indptr, h._incident = (None, None) if indptr is None or incident is None else (indptr, incident)
+        return h
+
+    def _edges_at(self, ids) -> np.ndarray:
+        if self.edge_array is not None:
+            return self.edge_array[ids]
+        ranks = self.edge_ranks[ids]
+        return self.ranks.unrank(from_words(ranks) if ranks.ndim == 2 else ranks)
+
+    def _find(self, ranks: np.ndarray) -> np.ndarray:
+        if self.edge_ranks.ndim == 1:
+            pos = np.searchsorted(self.edge_ranks, ranks)
+            found = pos < len(self.edge_ranks)
+            found[found] = self.edge_ranks[pos[found]] == ranks[found]
+            return found
+
+        # the rows are sorted by high word, then by low word within each run of equal high words
+        words = to_words(ranks)
+        high, low = self.edge_ranks[:, 1], self.edge_ranks[:, 0]
+        starts = np.searchsorted(high, words[:, 1], side="left")
+        stops = np.searchsorted(high, words[:, 1], side="right")
+        found = np.zeros(len(ranks), dtype=bool)
+        for i in np.flatnonzero(starts < stops).tolist():
+            pos = starts[i] + np.searchsorted(low[starts[i]:stops[i]], words[i, 0])
+            found[i] = pos < stops[i] and low[pos] == words[i, 0]
+        return found
+
+    def nbytes(self) -> int:
+        arrays = (self.edge_ranks, self.edge_array, self._incident, self._indptr)
+        return sum(a.nbytes for a in arrays if a is not None)
+
+    def is_edge_batch(self, edges: np.ndarray) -> np.ndarray:
+        edges = np.asarray(edges, dtype=np.int64)
+        if edges.ndim != 2 or edges.shape[1] != self.k:
+            return np.zeros(len(edges), dtype=bool)
+
+        inside = np.flatnonzero(valid_edges(edges, self.N))
+        mask = np.zeros(len(edges), dtype=bool)
+        mask[inside] = self._find(self.ranks.rank(edges[inside]))
+        return mask
+
+    def neighbour_blocks(self, node: int, block_size: int = BLOCK_SIZE, progress: bool = False):
+        for lo in range(self.indptr[node], self.indptr[node + 1], block_size):
+            edges = self._edges_at(self.incident[lo:min(lo + block_size, self.indptr[node + 1])])
+            yield edges[edges != node].reshape(-1, self.k - 1)
+
+    def degree(self, node: int):
+        return int(self.indptr[node + 1] - self.indptr[node])
+
+    def degree_sequence(self, workers=None) -> np.ndarray:
+        return np.diff(self.indptr)
+
+    def link(self, s: List[int]) -> Hypergraph:
+        # intersect the sorted ranks of each vertex's incident edges with that vertex removed
+        link_ranks = number_system(self.N, self.k - 1)
+        common = None
+        for v in s:
+            ranks = np.concatenate([link_ranks.rank(block) for block in self.neighbour_blocks(v)]
+                                   or [np.empty(0, dtype=link_ranks.dtype)])
+            common = ranks if common is None else np.intersect1d(common, ranks, assume_unique=True)
+        return ExplicitHypergraph.from_ranks(self.k - 1, self.N, common, n=self.n - len(s))
+
+    def edge_blocks(self, block_size: int = BLOCK_SIZE):
+        for lo in range(0, len(self.edge_ranks), block_size):
+            yield self._edges_at(slice(lo, lo + block_size))
 
     def num_edges(self):
-        return binom(self.N, self.k) // self.mod
+        return len(self.edge_ranks)
 
+    def count_edges_at_least(self, threshold) -> int:
+        return self.num_edges()
 
 
-class RandomPermutationHypergraph(Hypergraph):
+class BitsetHypergraph(BatchHypergraph):
+    """A fixed k-uniform hypergraph on range(N), stored as a packed edge indicator over the
+    lexicographic ranks of all k-subsets of range(N).
+    """
 
-    def __init__(self, n, k, m, N):
-        if RandomPermutation is None:
-            raise ImportError(
-                "RandomPermutationHypergraph requires the optional "
-                "'random_permutation' package/module."
-            )
-        super().__init__(n, k, N)
-        self.m = m
-        self.perm = RandomPermutation(binom(n, k), num_ciphers=1)
-        self.end = n
-        self.start = 0
+    def __init__(self, k, N, bits: np.ndarray, n=None):
+        super().__init__(N if n is None else n, k, N)
+        self.ranks = number_system(N, k)
+        assert self.ranks.dtype is not object, "Too many k-subsets to index with a bitset"
+        self.bits = bits
+        # counted on first use, so mapping a large indicator file stays instant
+        self._m = None
 
-    def get_edge_index(self, edge):
-        comb = sorted(edge)
+    @classmethod
+    def from_ranks(cls, k, N, ranks: np.ndarray, n=None) -> "BitsetHypergraph":
+        return cls(k, N, pack_indices(ranks, number_system(N, k).total), n=n)
 
-        idx = 0
-        comb = [self.start - 1] + list(comb)
+    def nbytes(self) -> int:
+        return self.bits.nbytes
 
-        for pos in range(1, self.k + 1):
-            displacement = comb[pos] - comb[pos - 1] - 1
-            for j in range(1, displacement + 1):
-                idx += int(binom(self.end - (comb[pos - 1] + j + 1), self.k - pos))
+    def is_edge_batch(self, edges: np.ndarray) -> np.ndarray:
+        edges = np.asarray(edges, dtype=np.int64)
+        if edges.ndim != 2 or edges.shape[1] != self.k:
+            return np.zeros(len(edges), dtype=bool)
 
-        return idx
+        inside = np.flatnonzero(valid_edges(edges, self.N))
+        mask = np.zeros(len(edges), dtype=bool)
+        mask[inside] = test_bits(self.bits, self.ranks.rank(edges[inside]))
+        return mask
 
-    def is_edge(self, edge: Tuple[int, ...]) -> bool:
-        if len(edge) != self.k:
-            return False
-        permuted_idx = self.perm[self.get_edge_index(edge)]
-        return permuted_idx < self.m
+    def edge_blocks(self, block_size: int = BLOCK_SIZE):
+        # block_size is rounded to whole bytes of the indicator
+        step = max(1, block_size // 8)
+        for lo in range(0, len(self.bits), step):
+            present = np.unpackbits(self.bits[lo:lo + step], bitorder="little")
+            yield self.ranks.unrank(8 * lo + np.flatnonzero(present))
 
     def num_edges(self):
-        return self.m
+        if self._m is None:
+            self._m = popcount(self.bits)
+        return self._m
+
+    def count_edges_at_least(self, threshold) -> int:
+        return self.num_edges()
+
+
+class DenseHypergraph(BatchHypergraph):
+    """A fixed k-uniform hypergraph on range(N), stored as a symmetric boolean tensor of shape
+    (N,) * k that is True at every ordering of every edge.
+
+    Entries with a repeated index are False, so the slice at v already excludes v and the link
+    of a set is the AND of its members' slices. Degrees and edge counts are tensor sums divided
+    by the number of orderings each edge appears in.
+    """
+
+    def __init__(self, k, N, tensor: np.ndarray, n=None):
+        super().__init__(N if n is None else n, k, N)
+        assert tensor.shape == (N,) * k, "The tensor must have shape (N,) * k"
+        self.tensor = tensor
+
+    @classmethod
+    def from_edges(cls, k, N, edges: np.ndarray, n=None) -> "DenseHypergraph":
+        edges = np.asarray(edges, dtype=np.int64).reshape(-1, k)
+        tensor = np.zeros((N,) * k, dtype=bool)
+        for perm in permutations(range(k)):
+            tensor[tuple(edges[:, perm].T)] = True
+        return cls(k, N, tensor, n=n)
+
+    @classmethod
+    def from_hypergraph(cls, h: Hypergraph) -> "DenseHypergraph":
+        """Evaluate every k-set of `h` once, a block at a time."""
+        edges = list(h.edge_blocks())
+        edges = np.concatenate(edges) if edges else np.empty((0, h.k), dtype=np.int64)
+        return cls.from_edges(h.k, h.N, edges, n=h.n)
+
+    def nbytes(self) -> int:
+        return self.tensor.nbytes
+
+    def is_edge_batch(self, edges: np.ndarray) -> np.ndarray:
+        edges = np.asarray(edges, dtype=np.int64)
+        if edges.ndim != 2 or edges.shape[1] != self.k:
+            return np.zeros(len(edges), dtype=bool)
+
+        inside = np.flatnonzero(valid_edges(edges, self.N))
+        mask = np.zeros(len(edges), dtype=bool)
+        mask[inside] = self.tensor[tuple(edges[inside].T)]
+        return mask
+
+    def analytic_degree(self, node: int) -> Optional[int]:
+        if not 0 <= node < self.N:
+            return 0
+        return int(np.count_nonzero(self.tensor[node])) // factorial(self.k - 1)
+
+    def analytic_num_edges(self) -> Optional[int]:
+        return int(np.count_nonzero(self.tensor)) // factorial(self.k)
+
+    def degree_sequence(self, workers=None) -> np.ndarray:
+        return self.tensor.sum(axis=tuple(range(1, self.k)), dtype=np.int64) // factorial(self.k - 1)
+
+    def link(self, s: List[int]) -> Hypergraph:
+        tensor = np.logical_and.reduce([self.tensor[v] for v in s])
+        return DenseHypergraph(self.k - 1, self.N, tensor, n=self.n - len(s))
+
+    def edge_blocks(self, block_size: int = BLOCK_SIZE):
+        for block in combination_blocks(self.N, self.k, block_size):
+            yield block[self.tensor[tuple(block.T)]]
+
+
+class PlantedHypergraph(BatchHypergraph):
+    """`background` plus a planted complete k-partite K^(k)(t, ..., t) on hidden vertex classes.
+
+    The classes are `parts`, drawn at random from range(N) unless given. Every k-set queried
+    through `is_edge_batch` is counted in `stats["queries"]`, which links built by `link`
+    share, so benchmarks can report the oracle calls a search made.
+    """
+
+    def __init__(self, background: Hypergraph, t=None, seed=1234, parts=None, stats=None):
+        super().__init__(background.n, background.k, background.N)
+        self.background = background
+        if parts is None:
+            vtxs = np.random.default_rng(seed).choice(background.N, size=background.k * t, replace=False)
+            parts = [sorted(vtxs[i * t:(i + 1) * t].tolist()) for i in range(background.k)]
+        assert len(parts) == self.k, "There must be one part per edge vertex"
+        self.parts = [list(part) for part in parts]
+        self.stats = {"queries": 0} if stats is None else stats
+
+        self.part_of = np.full(self.N, -1, dtype=np.int64)
+        for i, part in enumerate(self.parts):
+            self.part_of[part] = i
+
+    def cache_params(self) -> Optional[dict]:
+        base = self.background.cache_params()
+        if base is None:
+            return None
+        return {"background": type(self.background).__name__, "params": base, "parts": self.parts}
+
+    def planted_edges(self) -> np.ndarray:
+        return np.array(list(product(*self.parts)), dtype=np.int64).reshape(-1, self.k)
+
+    def is_planted_copy(self, parts: List[List[int]]) -> bool:
+        """Whether `parts` are the planted classes, in any order."""
+        return sorted(map(sorted, parts)) == sorted(map(sorted, self.parts))
+
+    def is_edge_batch(self, edges: np.ndarray) -> np.ndarray:
+        edges = np.asarray(edges, dtype=np.int64)
+        if edges.ndim != 2 or edges.shape[1] != self.k:
+            return np.zeros(len(edges), dtype=bool)
+
+        self.stats["queries"] += len(edges)
+        inside = valid_edges(edges, self.N)
+        # planted edges take exactly one vertex from each part
+        parts = np.sort(self.part_of[np.where(inside[:, None], edges, 0)], axis=1)
+        planted = inside & (parts == np.arange(self.k)).all(axis=1)
+        return planted | self.background.is_edge_batch(edges)
+
+    def _planted_in_background(self, edges: np.ndarray) -> int:
+        return int(self.background.is_edge_batch(edges).sum()) if len(edges) else 0
+
+    def analytic_degree(self, node: int) -> Optional[int]:
+        deg = self.background.analytic_degree(node)
+        if deg is None or not 0 <= node < self.N or self.part_of[node] < 0:
+            return deg
+        others = [[node] if i == self.part_of[node] else part for i, part in enumerate(self.parts)]
+        edges = np.array(list(product(*others)), dtype=np.int64).reshape(-1, self.k)
+        return deg + len(edges) - self._planted_in_background(edges)
+
+    def analytic_num_edges(self) -> Optional[int]:
+        m = self.background.analytic_num_edges()
+        if m is None:
+            return None
+        edges = self.planted_edges()
+        return m + len(edges) - self._planted_in_background(edges)
+
+    def link(self, s: List[int]) -> Hypergraph:
+        planted = [v for v in s if self.part_of[v] >= 0]
+        if not planted:
+            # no planted edge goes through s, so only the background contributes; empty parts
+            # plant nothing but keep counting its queries in the shared stats
+            return PlantedHypergraph(self.background.link(s), parts=[[] for _ in range(self.k - 1)],
+                                     stats=self.stats)
+        if len(s) == 1:
+            # a single vertex's link is the union of the two links
+            i = self.part_of[s[0]]
+            return PlantedHypergraph(self.background.link(s), parts=self.parts[:i] + self.parts[i + 1:],
+                                     stats=self.stats)
+        return super().link(s)
 
 
 class LinkGraph(Hypergraph):
-    def __init__(self, h: Hypergraph, s: List[int]):
-        super().__init__(h.n - len(s), h.k - 1, h.N)
+    def __init__(self, h: Hypergraph, s: List[int], bitsets=None, layers=None, n=None):
+        # vertex sets linked on top of h, innermost first: e is an edge when e + (v_1, ..., v_d)
+        # is an edge of h for every choice of v_i in layers[i], so links of links stay flat
+        self.layers = [*(layers or []), list(s)]
+        super().__init__(h.n - len(s) if n is None else n, h.k - len(self.layers), h.N)
         self.h = h
         self.s = s
+        # optional bitset.LinkBitsets over h, answering queries by AND + popcount
+        self.bitsets = bitsets
+        self._bits = None
+        assert bitsets is None or len(self.layers) == 1, "Bitset engines only answer single links"
+
+    def cache_params(self) -> Optional[dict]:
+        base = self.h.cache_params()
+        if base is None:
+            return None
+        return {"h": type(self.h).__name__, "params": base,
+                "layers": [sorted(int(v) for v in layer) for layer in self.layers]}
+
+    def link(self, s: List[int]) -> Hypergraph:
+        if self.bitsets is not None:
+            return super().link(s)
+        return LinkGraph(self.h, list(s), layers=self.layers, n=self.n - len(s))
+
+    def bits(self) -> np.ndarray:
+        if self._bits is None:
+            self._bits = self.bitsets.link(self.s)
+        return self._bits
 
     def is_edge(self, edge: Tuple[int, ...]) -> bool:
         assert len(edge) == self.k
 
+        if len(self.layers) > 1:
+            return bool(self.is_edge_batch(np.array([edge]))[0])
+
         if any(v in self.s for v in edge):
             return False
 
@@ -128,20 +664,75 @@ class LinkGraph(Hypergraph):
 
         return all(self.h.is_edge((*edge, v)) for v in self.s)
 
+    def is_edge_batch(self, edges: np.ndarray) -> np.ndarray:
+        edges = np.asarray(edges, dtype=np.int64)
+        assert edges.ndim == 2 and edges.shape[1] == self.k, "The edges must have k vertices"
+
+        if self.bitsets is not None:
+            return self.bitsets.contains(self.bits(), edges)
+
+        members = [v for layer in self.layers for v in layer]
+        if len(set(members)) < len(members):
+            # overlapping layers would need an edge of h with a repeated vertex
+            return np.zeros(len(edges), dtype=bool)
+
+        mask = ~np.isin(edges, members).any(axis=1)
+        for vs in product(*self.layers):
+            idx = np.flatnonzero(mask)
+            if len(idx) == 0:
+                break
+            extended = np.column_stack((edges[idx], np.tile(np.array(vs, dtype=np.int64), (len(idx), 1))))
+            mask[idx] = self.h.is_edge_batch(extended)
+
+        return mask
+
+    def num_edges(self):
+        if self.bitsets is not None:
+            return popcount(self.bits())
+        return super().num_edges()
+
+    def count_edges_at_least(self, threshold) -> int:
+        if self.bitsets is not None:
+            return self.num_edges()
+        return super().count_edges_at_least(threshold)
+
+
+def link_of(h: Hypergraph, s: List[int], bitsets=None) -> Hypergraph:
+    """The link of `s` in `h`, through the bitset engine if one is given and `h.link` otherwise."""
+    if bitsets is not None:
+        return LinkGraph(h, list(s), bitsets)
+    return h.link(list(s))
+
+
+def materialize(h: Hypergraph) -> Hypergraph:
+    """Explicit copy of `h`: a sorted rank array when sparse, a packed bitset when dense."""
+    ranks = number_system(h.N, h.k)
+    if isinstance(h, LinkGraph) and h.bitsets is not None:
+        present = np.unpackbits(h.bits(), count=ranks.total, bitorder="little")
+        edge_ranks = np.flatnonzero(present)
+    else:
+        edge_ranks = [ranks.rank(block) for block in h.edge_blocks()]
+        edge_ranks = np.concatenate(edge_ranks) if edge_ranks else np.empty(0, dtype=ranks.dtype)
+
+    # an explicit edge costs a rank, its vertices and k incidence entries: (2k + 1) int64s
+    if ranks.dtype is object or 64 * (2 * h.k + 1) * len(edge_ranks) < ranks.total:
+        return ExplicitHypergraph.from_ranks(h.k, h.N, edge_ranks, n=h.n)
+    return BitsetHypergraph.from_ranks(h.k, h.N, edge_ranks, n=h.n)
+
 
 if __name__ == "__main__":
     G = RandomOracleGraph(k=3, p=0.5, N=10)
     print(G.num_edges())
     print(G.expected_num_edges())
 
-    if RandomPermutation is not None:
-        H = RandomPermutationHypergraph(n=10, k=3, m=60, N=10)
-        print(H.num_edges())
+    H = RandomPermutationHypergraph(n=10, k=3, m=60, N=10)
+    print(H.num_edges())
 
-        real_n_edges = 0
-        for i, e in enumerate(combinations(range(10), 3)):
-            if H.is_edge(e):
-                real_n_edges += 1
-            assert i == H.get_edge_index(e)
+    real_n_edges = 0
+    for i, e in enumerate(combinations(range(10), 3)):
+        if H.is_edge(e):
+            real_n_edges += 1
+        assert i == H.get_edge_index(e)
 
-        assert real_n_edges == H.num_edges()
+    assert real_n_edges == H.num_edges()
+    assert all(H.is_edge(tuple(e)) for block in H.edge_blocks() for e in block)
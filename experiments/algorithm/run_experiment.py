@@ -1,60 +1,171 @@
-from typing import List, Tuple
+from typing import Callable, List, Optional, Tuple
 import random
-from math import log, floor, ceil
-import heapq
+from math import comb, log, floor, ceil
+import time
 from scipy.special import binom
-from itertools import combinations
 
+import numpy as np
 from tqdm import tqdm
 
-from random_graph import Hypergraph, LinkGraph, StupidHypergraph
+from bitset import LinkBitsets
+from disk_cache import DiskCache
+from kst import KST_MAX_ENTRIES, find_kst
+from parallel import parallel_find_T
+from random_graph import (DENSE_MAX_ENTRIES, DenseHypergraph, Hypergraph, LinkGraph, PlantedHypergraph,
+                          StupidHypergraph, link_of, materialize)
 
 random.seed(1234)
 
 
-def get_deg_sum_at_least(h: Hypergraph, n_vtxs: int, min_deg_sum: int) -> List[int]:
-    min_heap = []
-    total_deg = 0
-
-    # for node in range(h.n):
-    for node in tqdm(range(h.n), position=0):
-
-        deg = h.degree(node)
-
-        if len(min_heap) < n_vtxs:
-            heapq.heappush(min_heap, (deg, node))
-            total_deg += deg
-
-        elif total_deg >= min_deg_sum:
-            return [node for _, node in min_heap]
-
-        elif deg > min_heap[0][0]:
-            total_deg -= min_heap[0][0]
-            total_deg += deg
-            heapq.heapreplace(min_heap, (deg, node))
-            print(f'{total_deg} > {min_deg_sum}')
-
-        print(f"curr_len: {len(min_heap)} / {n_vtxs}, curr_deg: {total_deg} / {min_deg_sum}")
+def get_deg_sum_at_least(h: Hypergraph, n_vtxs: int, min_deg_sum: int, degrees: Optional[np.ndarray] = None,
+                         block_size: int = 1024, workers: Optional[int] = None,
+                         degree_of: Optional[Callable[[int], float]] = None, verbose: bool = False) -> List[int]:
+    """The `n_vtxs` vertices of highest degree, once their degree sum reaches `min_deg_sum`.
+
+    Vertices of range(N) are scanned `block_size` at a time, keeping a running top `n_vtxs`
+    trimmed with `argpartition`, and the search stops at the first block after which their sum
+    is large enough. Degrees come from `degrees` when given, from `h.degree_sequence` on a
+    process pool when `workers` is set, and are computed block by block otherwise; all three
+    go through the same blocks, so they select the same vertices. The vertices are returned
+    by decreasing degree.
+    """
+    if degrees is None and workers is not None:
+        degrees = h.degree_sequence(workers)
+
+    degree_of = degree_of or h.degree
+    if degrees is not None:
+        degrees = np.asarray(degrees, dtype=np.float64)
+        assert len(degrees) == h.N, "There must be one degree per vertex in range(N)"
+        degrees_of = lambda vtxs: degrees[vtxs]
+    else:
+        degrees_of = lambda vtxs: np.fromiter((degree_of(v) for v in vtxs.tolist()), dtype=np.float64,
+                                              count=len(vtxs))
+    blocks = ((vtxs, degrees_of(vtxs))
+              for vtxs in (np.arange(lo, min(lo + block_size, h.N)) for lo in range(0, h.N, block_size)))
+
+    best_vtxs = np.empty(0, dtype=np.int64)
+    best_degs = np.empty(0, dtype=np.float64)
+
+    for vtxs, degs in tqdm(blocks, position=0, disable=not verbose):
+        best_vtxs = np.concatenate((best_vtxs, vtxs))
+        best_degs = np.concatenate((best_degs, degs))
+        if len(best_degs) > n_vtxs:
+            top = np.argpartition(-best_degs, n_vtxs - 1)[:n_vtxs]
+            best_vtxs, best_degs = best_vtxs[top], best_degs[top]
+
+        total_deg = float(best_degs.sum())
+        if verbose:
+            print(f"curr_len: {len(best_degs)} / {n_vtxs}, curr_deg: {total_deg} / {min_deg_sum}")
+
+        if len(best_degs) == n_vtxs and total_deg >= min_deg_sum:
+            return best_vtxs[np.argsort(-best_degs, kind="stable")].tolist()
 
     assert False, f"The algorithm did NOT work! Something went wrong{h.k, h.n, h.N, n_vtxs, min_deg_sum}"
 
 
-def get_partite(h: Hypergraph, min_m=None, t=None) -> Tuple[List, ...]:
+def find_T(h: Hypergraph, W: List[int], t: int, min_s, bitsets=None,
+           disk: Optional[DiskCache] = None) -> Tuple[Optional[List[int]], Optional[Hypergraph], int, int]:
+    """Depth-first branch and bound for the first T in combinations(W, t) with |link(T)| >= min_s.
+
+    Links only shrink as T grows, so a prefix whose link already has fewer than `min_s` edges
+    cuts its whole subtree; at depth 1 this is the single-vertex link bound. The candidates
+    are still visited in lexicographic order, so the result is the same T as a plain scan.
+    Link counts go through `disk` when given. Returns the T found and its link (or None twice),
+    the number of prefixes explored and the number of complete candidates pruned, i.e. never
+    evaluated because a proper prefix of theirs was cut.
+    """
+    explored = 0
+    pruned = 0
+
+    def search(prefix: Tuple[int, ...], start: int) -> Optional[Tuple[List[int], Hypergraph]]:
+        nonlocal explored, pruned
+        for i in range(start, len(W) - (t - len(prefix)) + 1):
+            T = (*prefix, W[i])
+            link = link_of(h, T, bitsets)
+            explored += 1
+
+            if disk is not None:
+                count = disk.link_count_at_least(T, min_s, bitsets)
+            else:
+                count = link.count_edges_at_least(min_s)
+            if count < min_s:
+                if len(T) < t:
+                    pruned += comb(len(W) - i - 1, t - len(T))
+                continue
+
+            found = (list(T), link) if len(T) == t else search(T, i + 1)
+            if found is not None:
+                return found
+
+        return None
+
+    T, link = search((), 0) or (None, None)
+    return T, link, explored, pruned
+
+
+def _degree_lower_bound(h: Hypergraph, v: int, samples: int) -> float:
+    deg = h.analytic_degree(v)
+    return deg if deg is not None else h.estimate_degree(v, samples).lower
+
+
+def get_partite(h: Hypergraph, min_m=None, t=None, use_bitsets=False, materialize_links=False,
+                workers=None, chunk_size=None, cache_dir=None, samples=None,
+                dense_max_entries=DENSE_MAX_ENTRIES, kst_max_entries=KST_MAX_ENTRIES) -> Tuple[List, ...]:
+    """Find t-sets T_1, ..., T_k spanning a complete k-partite subgraph of `h`.
+
+    With `samples` set, `min_m` and the degrees used to pick W are replaced by the lower ends
+    of Monte Carlo confidence intervals, which is all the argument needs, unless they are
+    available exactly (a degree array, or analytic counts). The W target is built from the
+    lower `min_m` while the degrees are lower bounds too, each from fewer samples; on nearly
+    regular hypergraphs, whose top degrees are barely above average, the top w estimates can
+    then fall short of it, and more samples are needed.
+    Once N ** k is at most `dense_max_entries`, `h` is evaluated into a `DenseHypergraph`,
+    whose degrees, links and edge counts are array operations, and so are those of every
+    level below it; hypergraphs with analytic counts are left alone. A graph (k = 2) with
+    N ** 2 at most `kst_max_entries` is handed to `kst.find_kst`, which looks for the K_{t,t}
+    through its codegree matrix instead, unless it has analytic counts and W fits in it.
+    """
     k = h.k
 
+    # closed-form hypergraphs answer everything faster than any copy of them would
+    analytic = h.analytic_num_edges() is not None
+    if k >= 2 and not analytic and not isinstance(h, DenseHypergraph) and h.N ** k <= dense_max_entries:
+        start = time.perf_counter()
+        h = DenseHypergraph.from_hypergraph(h)
+        print(f"dense: {h.nbytes()} bytes in {time.perf_counter() - start:.3f}s")
+    dense = isinstance(h, DenseHypergraph)
+
     if k == 1:
         ret = list(x for x in range(h.N) if h.is_edge((x,)))
         if t is not None:
             assert len(ret) >= t, f"t ({t}) must be less than the number of edges ({len(ret)})"
             return ret[:t],
 
-    if t is None:
-        if min_m is None:
+    kst_fits = k == 2 and h.N ** 2 <= kst_max_entries
+    # persist degrees and link counts across runs when h is determined by its parameters
+    disk = DiskCache(h, cache_dir) if cache_dir is not None and h.cache_params() is not None else None
+
+    # one degree pass serves both the edge count and the choice of W
+    degrees = None
+    if dense:
+        degrees = h.degree_sequence()
+    elif not kst_fits and disk is not None:
+        degrees = disk.degree_sequence(workers)
+    elif not kst_fits and workers is not None:
+        degrees = h.degree_sequence(workers)
+
+    if min_m is None:
+        if degrees is not None:
+            min_m = int(degrees.sum()) // k
+        elif samples is None or analytic:
             min_m = h.num_edges()
+        else:
+            min_m = h.estimate_num_edges(samples).lower
+
+    min_d = min_m / h.n ** k
+    print(f"min_d: {min_d}")
 
-        min_d = min_m / h.n ** k
-        print(f"min_d: {min_d}")
-        assert min_m is not None, "Either t or min_m must be provided"
+    if t is None:
         raw_t = (log(h.n / 2 ** (k - 1)) / log(3 / min_d)) ** (1 / (k - 1))
         print('raw_t:', raw_t)
         t = floor(raw_t)
@@ -62,21 +173,62 @@ def get_partite(h: Hypergraph, min_m=None, t=None) -> Tuple[List, ...]:
     assert t >= 2, "t must be at least 2"
 
     w = ceil(2 * t / min_d)
-    W = get_deg_sum_at_least(h, w, w * k * min_d * h.n ** (k - 1))
+    # a codegree pass enumerates every pair, so closed-form graphs only take it when no W fits
+    if kst_fits and (dense or not analytic or w > h.N):
+        S, T = find_kst(h, t, t, stats=False)[:2]
+        assert S is not None, "The algorithm did NOT work! Something went wrong"
+        print(f"S: {S}, T: {T}")
+        return S, T
+
+    degree_of = None if samples is None else (lambda v: _degree_lower_bound(h, v, samples))
+    W = get_deg_sum_at_least(h, w, w * k * min_d * h.n ** (k - 1), degrees=degrees, workers=workers,
+                             degree_of=degree_of)
     print(f"w: {w}, W: {W}")
     min_s = min_d ** t * h.n ** (k - 1)
 
-    T = None
-    h_prime = None
-
-    for T in combinations(W, t):
-        h_prime = LinkGraph(h, list(T))
-        if h_prime.num_edges() >= min_s:
-            print(f"T: {T}, min_s: {min_s}, num_edges: {h_prime.num_edges()}")
-            break
-
-    assert T is not None and h_prime is not None, "The algorithm did NOT work! Something went wrong"
-    return list(T), *get_partite(h_prime, min_s, t=t)
+    # dense links are already ANDs of slices
+    bitsets = LinkBitsets(h) if use_bitsets and not dense else None
+    if workers is None:
+        T, h_prime, explored, pruned = find_T(h, W, t, min_s, bitsets, disk)
+        print(f"explored: {explored}, pruned: {pruned} / {comb(len(W), t)}")
+    else:
+        T, searched = parallel_find_T(h, W, t, min_s, workers, chunk_size, use_bitsets)
+        h_prime = None if T is None else link_of(h, T, bitsets)
+        print(f"searched {searched} chunks on {workers} workers")
+
+    assert h_prime is not None, "The algorithm did NOT work! Something went wrong"
+    print(f"T: {T}, min_s: {min_s}")
+
+    if materialize_links and isinstance(h_prime, LinkGraph):
+        # stop the next level from fanning each query out over every layer above it; native
+        # links (explicit, dense, analytic) are already as cheap as a copy would be
+        start = time.perf_counter()
+        h_prime = materialize(h_prime)
+        print(f"materialized {type(h_prime).__name__}: {h_prime.nbytes()} bytes "
+              f"in {time.perf_counter() - start:.3f}s")
+
+    return list(T), *get_partite(h_prime, min_s, t=t, use_bitsets=use_bitsets, materialize_links=materialize_links,
+                                 workers=workers, chunk_size=chunk_size, cache_dir=cache_dir, samples=samples,
+                                 dense_max_entries=dense_max_entries, kst_max_entries=kst_max_entries)
+
+
+def benchmark_planted(h: PlantedHypergraph, **kwargs) -> dict:
+    """Run `get_partite(h, **kwargs)` and record its latency, oracle calls and whether it
+    returned the planted copy.
+
+    The dense backend is off unless asked for, since it would query every k-set up front.
+    With `workers`, queries made in the worker processes are not counted.
+    """
+    kwargs.setdefault("dense_max_entries", 0)
+    queries = h.stats["queries"]
+    start = time.perf_counter()
+    parts = get_partite(h, **kwargs)
+    return {
+        "seconds": time.perf_counter() - start,
+        "queries": h.stats["queries"] - queries,
+        "planted": h.is_planted_copy(list(parts)),
+        "parts": parts,
+    }
 
 
 def main():
@@ -0,0 +1,257 @@
+import os
+import struct
+import tempfile
+import time
+import warnings
+import zlib
+from itertools import islice
+from math import comb
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+from combinatorics import number_system, rank_dtype, to_words, valid_edges
+from random_graph import ExplicitHypergraph, Hypergraph
+
+MAGIC = b"TFMHYPG\0"
+VERSION = 1
+FLAG_CSR = 1
+
+# magic, version, flags, n, k, N, m, rank_words, crc32 of the sections
+HEADER = struct.Struct("<8sIIQQQQQQ")
+ALIGN = 64
+CHUNK = 2 ** 24
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGN) * ALIGN
+
+
+def _rank_words(N: int, k: int) -> int:
+    # ranks are stored as int64 when they fit the in-memory rank dtype, otherwise as
+    # little-endian (low, high) uint64 pairs, i.e. uint128
+    return 1 if rank_dtype(N, k) is not object else 2
+
+
+def _wide_ranks(ranks: np.ndarray):
+    for lo in range(0, len(ranks), CHUNK):
+        chunk = ranks[lo:lo + CHUNK]
+        yield np.asarray(chunk, dtype="<u8") if chunk.ndim == 2 else to_words(chunk)
+
+
+def _sections(h: ExplicitHypergraph, with_csr: bool) -> list:
+    """The file sections, each as an iterable of arrays written back to back."""
+    if _rank_words(h.N, h.k) == 1:
+        sections = [[np.asarray(h.edge_ranks, dtype="<i8")]]
+    else:
+        sections = [_wide_ranks(h.edge_ranks)]
+    if with_csr:
+        sections += [[np.asarray(h.indptr, dtype="<i8")], [np.asarray(h.incident, dtype="<i8")]]
+    return sections
+
+
+def save_hypergraph(h: Hypergraph, path, with_csr: bool = True):
+    """Write `h` in the versioned binary format read by `load_hypergraph`.
+
+    The file is a 64-byte header followed by 64-byte aligned sections: the sorted edge ranks
+    and, with `with_csr`, the `indptr` and `incident` arrays of the vertex-to-edge index.
+    Hypergraphs that are not explicit are enumerated first.
+    """
+    if comb(h.N, h.k) >= 2 ** 128:
+        raise ValueError(f"C({h.N}, {h.k}) ranks do not fit in uint128")
+
+    if not isinstance(h, ExplicitHypergraph):
+        ranks = number_system(h.N, h.k)
+        h = ExplicitHypergraph.from_ranks(h.k, h.N, np.concatenate(
+            [ranks.rank(block) for block in h.edge_blocks()] or [np.empty(0, dtype=ranks.dtype)]), n=h.n)
+
+    flags = FLAG_CSR if with_csr else 0
+    rank_words = _rank_words(h.N, h.k)
+    with open(path, "wb") as f:
+        f.write(b"\0" * HEADER.size)
+        crc = 0
+        for section in _sections(h, with_csr):
+            f.write(b"\0" * (_aligned(f.tell()) - f.tell()))
+            for array in section:
+                for lo in range(0, len(array), CHUNK):
+                    chunk = np.ascontiguousarray(array[lo:lo + CHUNK])
+                    crc = zlib.crc32(memoryview(chunk).cast("B"), crc)
+                    chunk.tofile(f)
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, flags, h.n, h.k, h.N, h.num_edges(), rank_words, crc))
+
+
+def load_hypergraph(path, verify: bool = False) -> ExplicitHypergraph:
+    """Memory-map a file written by `save_hypergraph` as an `ExplicitHypergraph`.
+
+    Nothing is read besides the header, unless `verify` recomputes the checksum; uint128 ranks
+    are mapped as (m, 2) words too. Files saved without the CSR index get it built in memory on
+    the first degree or neighbourhood query.
+    """
+    with open(path, "rb") as f:
+        magic, version, flags, n, k, N, m, rank_words, crc = HEADER.unpack(f.read(HEADER.size))
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a hypergraph file")
+    if version != VERSION:
+        raise ValueError(f"{path} has format version {version}, expected {VERSION}")
+
+    offset = _aligned(HEADER.size)
+    sections = []
+    shapes = [(m, rank_words)]
+    if flags & FLAG_CSR:
+        shapes += [(N + 1,), (k * m,)]
+    for shape in shapes:
+        dtype = "<u8" if len(shape) == 2 and rank_words == 2 else "<i8"
+        size = int(np.prod(shape))
+        sections.append(np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape) if size else
+                        np.empty(shape, dtype=dtype))
+        offset = _aligned(offset + 8 * size)
+
+    if verify:
+        actual = 0
+        for section in sections:
+            flat = section.reshape(-1)
+            for lo in range(0, len(flat), CHUNK):
+                actual = zlib.crc32(memoryview(np.ascontiguousarray(flat[lo:lo + CHUNK])).cast("B"), actual)
+        if actual != crc:
+            raise ValueError(f"{path} is corrupted: checksum mismatch")
+
+    # uint128 ranks stay (m, 2) words, which ExplicitHypergraph searches without converting
+    ranks = sections[0].reshape(-1) if rank_words == 1 else sections[0]
+
+    indptr, incident = sections[1:] if flags & FLAG_CSR else (None, None)
+    return ExplicitHypergraph.from_arrays(k, N, ranks, indptr, incident, n=n)
+
+
+def _edge_chunks(path, k: int, chunk_edges: int, delimiter: Optional[str], base: int) -> Iterator[np.ndarray]:
+    """The first k columns of the edge lines of `path`, `chunk_edges` lines at a time."""
+    with open(path) as f:
+        while True:
+            lines = list(islice(f, chunk_edges))
+            if not lines:
+                return
+            with warnings.catch_warnings():
+                # a chunk made only of comments is not an error
+                warnings.simplefilter("ignore", UserWarning)
+                edges = np.loadtxt(lines, dtype=np.int64, comments=("#", "%"), delimiter=delimiter,
+                                   usecols=range(k), ndmin=2)
+            if len(edges):
+                yield edges - base
+
+
+def _merge_runs(runs: List[Path], out, block: int) -> int:
+    """k-way merge of sorted, duplicate-free rank files into `out`; returns the number written.
+
+    Each run is read `block` ranks at a time. Everything up to the smallest of the buffered
+    maxima is final, so it is taken from every buffer at once, deduplicated with `np.unique`
+    and written; the run that owned that maximum is then refilled.
+    """
+    readers = [np.load(run, mmap_mode="r") for run in runs]
+    pos = [min(block, len(r)) for r in readers]
+    buffers = [np.array(r[:p]) for r, p in zip(readers, pos)]
+    written = 0
+
+    while True:
+        active = [i for i, b in enumerate(buffers) if len(b)]
+        if not active:
+            return written
+        frontier = min(buffers[i][-1] for i in active)
+
+        parts = []
+        for i in active:
+            cut = np.searchsorted(buffers[i], frontier, side="right")
+            parts.append(buffers[i][:cut])
+            buffers[i] = buffers[i][cut:]
+            if not len(buffers[i]):
+                buffers[i] = np.array(readers[i][pos[i]:pos[i] + block])
+                pos[i] += len(buffers[i])
+
+        merged = np.unique(np.concatenate(parts))
+        merged.astype("<i8").tofile(out)
+        written += len(merged)
+
+
+def _csr_on_disk(edge_ranks: np.ndarray, k: int, N: int, work_dir: Path, chunk: int):
+    """`indptr` and `incident` of the sorted `edge_ranks`, as memmaps in `work_dir`.
+
+    A first pass counts each vertex's edges into `indptr`, a second one unranks `chunk` edges
+    at a time and scatters their ids to the next free slots of their vertices; ids arrive in
+    increasing order, so each vertex's slice of `incident` comes out sorted.
+    """
+    ranks = number_system(N, k)
+    m = len(edge_ranks)
+    indptr = np.lib.format.open_memmap(work_dir / "indptr.npy", mode="w+", dtype=np.int64, shape=(N + 1,))
+    incident = np.lib.format.open_memmap(work_dir / "incident.npy", mode="w+", dtype=np.int64,
+                                         shape=(max(k * m, 1),))
+    for lo in range(0, m, chunk):
+        indptr[1:] += np.bincount(ranks.unrank(edge_ranks[lo:lo + chunk]).ravel(), minlength=N)
+    np.cumsum(indptr, out=indptr)
+
+    cursor = np.lib.format.open_memmap(work_dir / "cursor.npy", mode="w+", dtype=np.int64, shape=(N,))
+    cursor[:] = indptr[:-1]
+    for lo in range(0, m, chunk):
+        flat = ranks.unrank(edge_ranks[lo:lo + chunk]).ravel()
+        order = np.argsort(flat, kind="stable")
+        vtxs = flat[order]
+        counts = np.bincount(vtxs, minlength=N)
+        # position of each entry within its vertex's group of this chunk
+        within = np.arange(len(vtxs)) - (np.cumsum(counts) - counts)[vtxs]
+        incident[cursor[vtxs] + within] = lo + order // k
+        cursor += counts
+    del cursor
+    os.remove(work_dir / "cursor.npy")
+
+    indptr.flush()
+    incident.flush()
+    return indptr, incident[:k * m]
+
+
+def ingest_edge_list(path, k: int, N: Optional[int] = None, work_dir=None, chunk_edges: int = 2 ** 22,
+                     delimiter: Optional[str] = None, base: int = 0, verbose: bool = True) -> ExplicitHypergraph:
+    """Read a text edge list, one edge per line, into an `ExplicitHypergraph`.
+
+    Lines hold at least k integer vertices (extra columns, e.g. weights, are ignored) and lines
+    starting with `#` or `%` are comments. The file is parsed `chunk_edges` lines at a time;
+    each chunk's edges are ranked, which also sorts their vertices, and spilled to `work_dir`
+    as a sorted, deduplicated run. The runs are then merged into a memory-mapped rank file
+    there, and the vertex-to-edge index is built next to it in two more passes, so memory
+    stays bounded by the chunk size whatever the size of the input.
+    Edges with repeated vertices or vertices outside range(N) are dropped. Without `N`, the
+    vertex count is taken from a first pass over the file. `base` is subtracted from every
+    label, e.g. 1 for one-based files.
+    """
+    start = time.perf_counter()
+    if N is None:
+        N = 1 + max((int(edges.max()) for edges in _edge_chunks(path, k, chunk_edges, delimiter, base)),
+                    default=k - 1)
+    ranks = number_system(N, k)
+    assert ranks.dtype is not object, f"C({N}, {k}) ranks do not fit in int64"
+
+    work_dir = Path(tempfile.mkdtemp(prefix="edges-") if work_dir is None else work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    runs = []
+    lines = dropped = 0
+    for edges in _edge_chunks(path, k, chunk_edges, delimiter, base):
+        lines += len(edges)
+        valid = valid_edges(edges, N)
+        dropped += int(len(edges) - valid.sum())
+        run = work_dir / f"run-{len(runs)}.npy"
+        np.save(run, np.unique(ranks.rank(edges[valid])))
+        runs.append(run)
+
+    out = work_dir / "ranks.bin"
+    with open(out, "wb") as f:
+        m = _merge_runs(runs, f, max(1, chunk_edges // max(len(runs), 1)))
+    for run in runs:
+        os.remove(run)
+
+    edge_ranks = np.memmap(out, dtype="<i8", mode="r", shape=(m,)) if m else np.empty(0, dtype=np.int64)
+    h = ExplicitHypergraph.from_arrays(k, N, edge_ranks, *_csr_on_disk(edge_ranks, k, N, work_dir, chunk_edges))
+    if verbose:
+        seconds = time.perf_counter() - start
+        print(f"ingested {lines} lines into {m} edges ({dropped} invalid dropped) in {seconds:.3f}s, "
+              f"{lines / max(seconds, 1e-9):.0f} edges/s")
+    return h